@@ -1,78 +1,104 @@
+import bisect
 import json
+import gzip
+import shutil
 import subprocess
 import atexit
 import threading
 import os
 import time
 import csv
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
-from queue import Queue, Empty
+from queue import Queue, Empty, Full
 from flask import Flask, jsonify, request, render_template, Response
 from sensor_reader import read_sensors, read_sensors_by_id, get_offsets, set_offset
-from control import TempController
+from control import TempController, HEAT_PIN, COOL_PIN, GPIO as RELAY_GPIO
+
+# Try to use orjson (Rust JSON encoder, ~3-10x faster than stdlib) for all
+# responses, fall back to stdlib json if not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- Dual Sensor Cache System ---
-# Control cache: Populated by background polling thread every 20s
-control_cache = {'data': None, 'timestamp': None, 'lock': threading.Lock()}
+# Both caches are immutable tuples swapped atomically by the single writer
+# (the polling thread). Tuple assignment/load is atomic under the GIL, so
+# readers never take a lock - they grab one reference and work on a
+# consistent snapshot.
+#
+# Control snapshot: (data, room_temp, safety_temp, all_temps, timestamp) -
+# room/safety temps and the frost-protection temperature list are resolved
+# once per refresh so control_loop and /api/status pay zero per-call lookup
+# work
+control_snapshot = (None, None, None, [], None)
 CONTROL_CACHE_DURATION = 20.0  # 20s cache, updated by background sensor thread
 
-# Display cache: All sensors for UI, read less frequently to avoid slowdown
-display_cache = {'data': None, 'timestamp': None, 'lock': threading.Lock()}
+# Display snapshot: (data, by_id, timestamp) - 'by_id' is a sensor_id ->
+# temperature index built once per refresh so readers resolve sensors with
+# a dict lookup instead of scanning the list
+display_snapshot = (None, None, None)
 DISPLAY_CACHE_DURATION = 10.0  # 10s cache to reduce sensor read frequency
 
-watchdog_timestamp = time.time()  # Global watchdog timestamp
+watchdog_timestamp = time.monotonic()  # Global watchdog timestamp (monotonic - immune to NTP jumps)
 
 # --- Server-Sent Events for Real-Time Updates ---
-sse_clients = []  # List of SSE client queues
+sse_clients = {}  # id(queue) -> client queue, so removal is a dict pop
 sse_lock = threading.Lock()
 
-# Utility: run a potentially slow callable with a timeout to avoid blocking API responses
-def _run_with_timeout(fn, timeout, *args, **kwargs):
-    outcome = {'done': False, 'result': None, 'error': None}
-
-    def target():
-        try:
-            outcome['result'] = fn(*args, **kwargs)
-        except Exception as e:
-            outcome['error'] = e
-        finally:
-            outcome['done'] = True
-
-    thread = threading.Thread(target=target, daemon=True)
-    thread.start()
-    thread.join(timeout)
-
-    if not outcome['done']:
-        print(f"WARNING: {fn.__name__} timed out after {timeout}s - thread still running")
-        return None, TimeoutError(f"{fn.__name__} timed out after {timeout}s")
-    if outcome['error'] is not None:
-        return None, outcome['error']
-    return outcome['result'], None
+# Single long-lived worker for the timed sensor reads: the polling loop used
+# to spawn (and on timeout, leak) a fresh thread per poll - 4320 short-lived
+# threads a day. The executor reuses one thread and a stuck read simply keeps
+# that worker busy until the driver call returns.
+_sensor_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sensor')
 
 def notify_clients(event_type, data):
     """Send update to all connected SSE clients"""
+    # Build the wire frame once per broadcast instead of letting every
+    # client generator re-encode the same dict
+    frame = f"event: {event_type}\ndata: {_encode_json(data).decode()}\n\n"
     with sse_lock:
-        dead_clients = []
-        for client_queue in sse_clients:
+        for client_queue in sse_clients.values():
+            _offer(client_queue, frame)
+
+def _offer(q, frame):
+    """Enqueue a frame, evicting the oldest pending one if the queue is full.
+
+    Every broadcast carries full state, so a client that falls behind only
+    loses stale updates; dropping the client itself (the old behaviour)
+    forced a reconnect handshake on a single burst of events.
+    """
+    while True:
+        try:
+            q.put_nowait(frame)
+            return
+        except Full:
             try:
-                client_queue.put_nowait({'type': event_type, 'data': data})
-            except:
-                dead_clients.append(client_queue)
-        # Remove dead clients
-        for dead in dead_clients:
-            sse_clients.remove(dead)
+                q.get_nowait()
+            except Empty:
+                continue
 
 def get_control_sensors():
     """Get Room + SafetySensor from cache - NEVER blocks on sensor reads"""
-    # Simply return cached data - background thread keeps it updated every 20s
-    with control_cache['lock']:
-        return control_cache['data'] or []
+    # One atomic snapshot load - background thread keeps it updated every 20s
+    return control_snapshot[0] or []
 
 def get_all_sensors():
     """Get all sensors from cache - NEVER blocks on sensor reads"""
-    # Simply return cached data - background thread keeps it updated every 20s
-    with display_cache['lock']:
-        return display_cache['data'] or []
+    # One atomic snapshot load - background thread keeps it updated every 20s
+    return display_snapshot[0] or []
+
+def get_control_temps():
+    """Get the (room_temp, safety_temp) pair resolved at the last cache refresh"""
+    snap = control_snapshot
+    return snap[1], snap[2]
+
+def get_sensor_index():
+    """Get the sensor_id -> temperature index from cache - NEVER blocks"""
+    return display_snapshot[1] or {}
 
 # --- GPIO Setup ---
 try:
@@ -109,20 +135,155 @@ atexit.register(cleanup_light_gpio)
 
 # --- App Setup ---
 app = Flask(__name__)
+app.json.sort_keys = False  # Skip key sorting on every response
+
+# Templates never change at runtime on the Pi: skip the mtime stat Jinja
+# does per render, and compile all three pages up front so the first page
+# view doesn't pay the parse cost
+app.config['TEMPLATES_AUTO_RELOAD'] = False
+app.jinja_env.auto_reload = False
+for _tmpl in ('index.html', 'history.html', 'settings.html'):
+    try:
+        app.jinja_env.get_template(_tmpl)
+    except Exception as e:
+        print(f"Warning: could not precompile template {_tmpl}: {e}")
+
+if orjson is not None:
+    from flask.json.provider import JSONProvider
+
+    class ORJSONProvider(JSONProvider):
+        """JSON provider backed by orjson - speeds up every jsonify call"""
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = ORJSONProvider(app)
+    print("Using orjson for JSON responses")
+
+# Compress big JSON bodies (mainly /api/history) when the client accepts it.
+# Temperature readings compress extremely well (repeating names, similar
+# numbers), so a week of history shrinks ~10x on the Pi's slow WLAN uplink.
+GZIP_MIN_SIZE = 1024
+
+@app.after_request
+def gzip_response(resp):
+    if (resp.status_code != 200
+            or resp.direct_passthrough
+            or resp.content_length is None
+            or resp.content_length < GZIP_MIN_SIZE
+            or 'gzip' not in request.headers.get('Accept-Encoding', '')
+            or resp.headers.get('Content-Encoding')):
+        return resp
+    # Level 6 default is wasted CPU here; level 1 already gets most of the
+    # win on this kind of data
+    resp.set_data(gzip.compress(resp.get_data(), compresslevel=1))
+    resp.headers['Content-Encoding'] = 'gzip'
+    resp.headers.add('Vary', 'Accept-Encoding')
+    return resp
+
+def _encode_json(obj):
+    """Serialize to JSON bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+def get_request_json():
+    """Parse the POST body in one shot, with orjson when available.
+
+    Skips Flask's content-type negotiation and body re-buffering; returns
+    an empty dict for a missing/invalid body so handlers can .get() their
+    fields and fall back to defaults.
+    """
+    raw = request.get_data(cache=False)
+    if not raw:
+        return {}
+    try:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+    except Exception:
+        return {}
+
+# --- Debounced State Persistence ---
+# POST handlers only mark their state file dirty; a background writer
+# coalesces bursts and flushes at most once per STATE_FLUSH_INTERVAL via
+# write-to-temp + os.replace. This collapses O(requests) SD-card writes
+# into O(1) writes/interval and the atomic rename means the JSON files on
+# disk are never half-written.
+STATE_FLUSH_INTERVAL = 2.0
+_dirty_state = set()
+_dirty_lock = threading.Lock()
+_dirty_event = threading.Event()
+
+# Serialized bytes of the last write per path: the UI re-POSTs identical
+# settings on page load, and skipping the no-op rewrite spares the SD card
+_last_written = {}
+
+def _write_json_atomic(path, obj):
+    if orjson is not None:
+        raw = orjson.dumps(obj)
+    else:
+        raw = json.dumps(obj).encode()
+    if _last_written.get(path) == raw:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp, path)
+    _last_written[path] = raw
+
+def _read_json(path):
+    """Load a JSON state file with orjson when available"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _mark_dirty(name):
+    with _dirty_lock:
+        _dirty_state.add(name)
+    _dirty_event.set()
+
+def flush_state_now():
+    """Write out any dirty state files - called by the flusher and at exit"""
+    with _dirty_lock:
+        pending = list(_dirty_state)
+        _dirty_state.clear()
+        _dirty_event.clear()
+    for name in pending:
+        try:
+            if name == 'settings':
+                _write_json_atomic(SETTINGS_FILE, settings)
+            elif name == 'light':
+                _write_json_atomic(LIGHT_STATE_FILE, {"on": light_on})
+            elif name == 'control_enable':
+                _write_json_atomic(CONTROL_ENABLE_FILE, {"enabled": control_enabled})
+        except Exception as e:
+            print(f"Error flushing {name} state: {e}")
+
+def state_flush_loop():
+    """Background thread that debounces state writes to the SD card"""
+    while True:
+        _dirty_event.wait()
+        time.sleep(STATE_FLUSH_INTERVAL)  # Let bursts of changes coalesce
+        flush_state_now()
+
+atexit.register(flush_state_now)
 
 # --- Control Enable Persistence ---
 CONTROL_ENABLE_FILE = "control_enable.json"
 
 def load_control_enabled():
     try:
-        with open(CONTROL_ENABLE_FILE, "r") as f:
-            return json.load(f).get("enabled", True)
+        return _read_json(CONTROL_ENABLE_FILE).get("enabled", True)
     except Exception:
         return True
 
 def save_control_enabled(enabled):
-    with open(CONTROL_ENABLE_FILE, "w") as f:
-        json.dump({"enabled": enabled}, f)
+    _mark_dirty('control_enable')
 
 control_enabled = load_control_enabled()
 
@@ -131,14 +292,12 @@ LIGHT_STATE_FILE = "light_state.json"
 
 def load_light_state():
     try:
-        with open(LIGHT_STATE_FILE, "r") as f:
-            return json.load(f).get("on", False)
+        return _read_json(LIGHT_STATE_FILE).get("on", False)
     except Exception:
         return False
 
 def save_light_state(on):
-    with open(LIGHT_STATE_FILE, "w") as f:
-        json.dump({"on": on}, f)
+    _mark_dirty('light')
 
 light_on = load_light_state()
 # Initialize GPIO with saved state
@@ -150,14 +309,12 @@ SETTINGS_FILE = "settings.json"
 
 def load_settings():
     try:
-        with open(SETTINGS_FILE, "r") as f:
-            return json.load(f)
+        return _read_json(SETTINGS_FILE)
     except Exception:
         return {}
 
 def save_settings(settings):
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(settings, f)
+    _mark_dirty('settings')
 
 settings = load_settings()
 target = settings.get("target", 12.0)
@@ -165,62 +322,230 @@ deviation = settings.get("deviation", 0.5)
 safety_off_temp = settings.get("safety_off_temp", 28.0)
 safety_on_temp = settings.get("safety_on_temp", 25.0)
 SAFETY_SENSOR_NAME = "SafetySensor"  # Change this to your safety sensor's name
+
+# Sensor role assignments, promoted to module globals so the polling loop
+# doesn't repeat the settings lookups every cycle; updated by
+# /api/sensor_assignments when they change
+room_sensor_id = settings.get('room_sensor_id', '28-mock001')
+safety_sensor_id = settings.get('safety_sensor_id', '')
+
+def _control_id_set():
+    """Frozen set of the assigned control sensor IDs (safety is optional)"""
+    return frozenset(x for x in (room_sensor_id, safety_sensor_id) if x)
+
+# Assignments change rarely, so the membership set the polling loop filters
+# with is precomputed here and recomputed by /api/sensor_assignments
+control_sensor_ids = _control_id_set()
 controller = TempController(target=target, deviation=deviation, safety_sensor_name=SAFETY_SENSOR_NAME, safety_off=safety_off_temp, safety_on=safety_on_temp)
 
+def _fmt_ts(ts=None):
+    """Human-readable local time for log prints, without datetime allocation"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
+
 # --- Temperature Logging ---
+# Readings are buffered in memory and appended to the CSV in batches: one
+# open/write/close per flush instead of one per minute. Losing a few
+# buffered readings on a crash is acceptable; atexit flushes on clean stop.
+LOG_FILE = 'temperature_log.csv'
+LOG_BUFFER_MAX_ROWS = 32
+LOG_BUFFER_FLUSH_SECONDS = 300.0
+_log_buffer = deque()
+_log_buffer_lock = threading.Lock()
+_log_last_flush = time.monotonic()
+_log_fp = None  # Long-lived append handle, reopened after cleanup rotation
+
+def _get_log_fp():
+    """Return the persistent append handle, reopening if the file rotated.
+
+    The nightly cleanup swaps the log via os.replace, which would leave a
+    held handle writing into the unlinked old inode - compare inodes and
+    reopen when they diverge.
+    """
+    global _log_fp
+    if _log_fp is not None:
+        try:
+            if os.fstat(_log_fp.fileno()).st_ino == os.stat(LOG_FILE).st_ino:
+                return _log_fp
+        except OSError:
+            pass
+        _log_fp.close()
+        _log_fp = None
+    _log_fp = open(LOG_FILE, 'a', newline='')
+    return _log_fp
+
+def _close_log_fp():
+    global _log_fp
+    flush_temperature_log()
+    if _log_fp is not None:
+        _log_fp.close()
+        _log_fp = None
+
+def _csv_field(value):
+    """Quote a log field only when it actually needs it (names are the
+    one user-supplied column; ids and numbers never contain delimiters)."""
+    if '"' in value:
+        return '"' + value.replace('"', '""') + '"'
+    if ',' in value or '\n' in value or '\r' in value:
+        return '"' + value + '"'
+    return value
+
+def flush_temperature_log():
+    """Append any buffered readings to the CSV log in one batched write"""
+    global _log_last_flush
+    with _log_buffer_lock:
+        rows = list(_log_buffer)
+        _log_buffer.clear()
+        _log_last_flush = time.monotonic()
+    if not rows:
+        return
+    try:
+        f = _get_log_fp()
+        # Fixed numeric/hex-id schema, so skip csv.writer's per-field
+        # quoting dispatch and join the lines ourselves; only the
+        # user-supplied name column can ever need CSV quoting
+        f.write(''.join(
+            f'{ts},{sid},{_csv_field(name)},{temp}\n'
+            for ts, sid, name, temp in rows))
+        f.flush()  # Out to the kernel; fsync is deliberately skipped
+    except Exception as e:
+        print(f"Error flushing temperature log: {e}")
+
+atexit.register(_close_log_fp)
+
 def log_temperature_data(sensors):
-    """Log temperature readings to CSV file with sensor names"""
-    log_file = 'temperature_log.csv'
+    """Buffer temperature readings with sensor names for the batched flush"""
     timestamp = int(time.time())
     sensor_names = settings.get('sensor_names', {})
-    
-    with open(log_file, 'a', newline='') as f:
-        writer = csv.writer(f)
-        for sensor in sensors:
-            sensor_id = sensor.get('id', '')
-            name = sensor_names.get(sensor_id, sensor_id)  # Get name or use ID as fallback
-            temp = sensor.get('temperature', '')
-            # Write in 4-column format: timestamp, sensor_id, name, temperature
-            writer.writerow([timestamp, sensor_id, name, temp])
+
+    # Build the rows outside the lock; the reader dicts always carry 'id'
+    # and 'temperature', so subscript directly instead of .get() fallbacks
+    rows = []
+    for sensor in sensors:
+        sensor_id = sensor['id']
+        temp = sensor['temperature']
+        # The DS18B20 resolves ~0.0625 degC, so logging full float repr
+        # ("22.437500000000004") just bloats the rows; two decimals
+        # keep the full sensor resolution in half the bytes
+        if isinstance(temp, float):
+            temp = round(temp, 2)
+        # Buffer in 4-column format: timestamp, sensor_id, name, temperature
+        rows.append((timestamp, sensor_id, sensor_names.get(sensor_id, sensor_id), temp))
+
+    with _log_buffer_lock:
+        _log_buffer.extend(rows)
+        flush_due = (len(_log_buffer) >= LOG_BUFFER_MAX_ROWS
+                     or time.monotonic() - _log_last_flush >= LOG_BUFFER_FLUSH_SECONDS)
+    if flush_due:
+        flush_temperature_log()
 
 # --- Data Cleanup ---
+def _find_offset_ge(path, cutoff_timestamp):
+    """Byte offset of the first log line whose timestamp is >= cutoff.
+
+    Bisects on byte positions (realigning to line starts with readline)
+    instead of parsing the whole file. Only valid if the leading timestamp
+    column is sorted - appends normally are, but old logs contain
+    out-of-order blocks, so callers must verify the skipped prefix before
+    acting on the result (see _prefix_has_row_ge).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        # Bisection narrows [lo, hi); lo is always a line start with every
+        # line before it older than the cutoff (timestamps are monotonic)
+        lo, hi = 0, size
+        while hi - lo > 4096:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            f.readline()  # realign to the next line start
+            pos = f.tell()
+            if pos >= hi:
+                hi = mid
+                continue
+            line = f.readline()
+            try:
+                ts = int(line.split(b',', 1)[0])
+            except ValueError:
+                # Malformed line: treat as old, same as the cleanup used to
+                ts = -1
+            if ts >= cutoff_timestamp:
+                hi = pos
+            else:
+                lo = pos + len(line)
+        # Finish the last block linearly to get the exact boundary
+        f.seek(lo)
+        offset = lo
+        for line in f:
+            try:
+                if int(line.split(b',', 1)[0]) >= cutoff_timestamp:
+                    break
+            except ValueError:
+                pass
+            offset += len(line)
+        return offset
+
+def _prefix_has_row_ge(path, offset, cutoff_timestamp):
+    """True if any line before `offset` has a timestamp >= cutoff.
+
+    Cheap guard for the bisection result: scans only leading timestamps,
+    no CSV parse, no writes.
+    """
+    with open(path, 'rb') as f:
+        while f.tell() < offset:
+            line = f.readline()
+            if not line:
+                break
+            try:
+                if int(line.split(b',', 1)[0]) >= cutoff_timestamp:
+                    return True
+            except ValueError:
+                pass  # Malformed line: treat as old, same as the bisection
+    return False
+
 def cleanup_old_temperature_data():
     """Remove temperature data older than 60 days from the CSV file"""
     log_file = 'temperature_log.csv'
     temp_file = 'temperature_log_temp.csv'
-    
+
     try:
         # Calculate cutoff timestamp (60 days ago)
-        cutoff_date = datetime.now() - timedelta(days=60)
-        cutoff_timestamp = int(cutoff_date.timestamp())
-        
-        rows_kept = 0
-        rows_removed = 0
-        
-        # Read existing data and write only recent data to temp file
-        with open(log_file, 'r') as infile, open(temp_file, 'w', newline='') as outfile:
-            reader = csv.reader(infile)
-            writer = csv.writer(outfile)
-            
-            for row in reader:
-                if not row or len(row) < 3:
-                    continue
-                    
-                try:
-                    timestamp = int(row[0])
-                    if timestamp >= cutoff_timestamp:
-                        writer.writerow(row)
-                        rows_kept += 1
+        cutoff_timestamp = int(time.time()) - 60 * 86400
+
+        # Bisect to the first row we keep, then copy the tail verbatim -
+        # no per-row CSV parse, just one buffered C-level copy
+        offset = _find_offset_ge(log_file, cutoff_timestamp)
+        if offset == 0:
+            print("Temperature data cleanup: nothing older than cutoff, log untouched")
+            return
+
+        # The bisection is only trustworthy on a timestamp-sorted log;
+        # out-of-order blocks could put retained rows before the offset.
+        # Verify the prefix and fall back to a row-by-row filter rather
+        # than ever deleting rows inside the retention window
+        if _prefix_has_row_ge(log_file, offset, cutoff_timestamp):
+            print("Temperature data cleanup: log not timestamp-sorted, filtering row by row")
+            dropped = 0
+            with open(log_file, 'rb') as infile, open(temp_file, 'wb') as outfile:
+                for line in infile:
+                    try:
+                        keep = int(line.split(b',', 1)[0]) >= cutoff_timestamp
+                    except ValueError:
+                        keep = False
+                    if keep:
+                        outfile.write(line)
                     else:
-                        rows_removed += 1
-                except (ValueError, IndexError):
-                    # Skip malformed rows
-                    continue
-        
+                        dropped += len(line)
+            os.replace(temp_file, log_file)
+            print(f"Temperature data cleanup completed: dropped {dropped} bytes of old rows")
+            return
+
+        with open(log_file, 'rb') as infile, open(temp_file, 'wb') as outfile:
+            infile.seek(offset)
+            shutil.copyfileobj(infile, outfile, 1 << 20)
+
         # Replace old file with cleaned file
         os.replace(temp_file, log_file)
-        print(f"Temperature data cleanup completed: kept {rows_kept} rows, removed {rows_removed} old rows")
-        
+        print(f"Temperature data cleanup completed: dropped {offset} bytes of old rows")
+
     except FileNotFoundError:
         print("Temperature log file not found, skipping cleanup")
     except Exception as e:
@@ -241,11 +566,18 @@ def cleanup_loop():
                 # If 3 AM has passed today, schedule for tomorrow
                 next_run += timedelta(days=1)
             
-            sleep_seconds = (next_run - now).total_seconds()
             print(f"Next cleanup scheduled for {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            time.sleep(sleep_seconds)
-            
+
+            # Sleep against the monotonic clock: an NTP step while we sleep
+            # can't fire the cleanup early or push it a day out. Wake at
+            # most hourly so a large correction still converges on 3 AM.
+            deadline = time.monotonic() + (next_run - now).total_seconds()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 3600))
+
             # Run cleanup
             cleanup_old_temperature_data()
             
@@ -254,50 +586,120 @@ def cleanup_loop():
             # Wait 1 hour before trying again if there's an error
             time.sleep(3600)
 
+# Serialized /api/status body, rebuilt only when one of its inputs actually
+# changed. The key captures everything volatile in the payload: the sensor
+# snapshot timestamp plus the controller/UI state flags.
+_status_cache = {'key': None, 'body': None}
+
+def _status_cache_key():
+    return (display_snapshot[2], control_enabled, light_on,
+            controller.current_state, controller.target, controller.deviation,
+            controller.heating_blocked, controller.cooling_blocked,
+            controller.min_temp)
+
+def get_status_body():
+    """Get the serialized status payload, re-encoding only on state change"""
+    key = _status_cache_key()
+    if _status_cache['key'] == key:
+        return _status_cache['body']
+    if orjson is not None:
+        body = orjson.dumps(build_status())
+    else:
+        body = json.dumps(build_status()).encode()
+    _status_cache['key'] = key
+    _status_cache['body'] = body
+    return body
+
+def build_status():
+    """Assemble the status payload served by /api/status and pushed over SSE"""
+    index = get_sensor_index()
+    all_temps = {}
+    sensor_names = settings.get('sensor_names', {})
+
+    # Room/safety temps were resolved when the cache refreshed
+    room_temp, safety_temp = get_control_temps()
+
+    # Build all temps dictionary with names
+    for sensor_id, temp in index.items():
+        name = sensor_names.get(sensor_id, sensor_id)
+        all_temps[name] = temp
+
+    # Return ACTUAL controller state, not recalculated values
+    return {
+        'should_heat': controller.is_heating if control_enabled else False,
+        'should_cool': controller.is_cooling if control_enabled else False,
+        'current_state': controller.current_state if control_enabled else 'idle',
+        'target': controller.target,
+        'deviation': controller.deviation,
+        'room_temp': room_temp,
+        'safety_temp': safety_temp,
+        'temps': all_temps,  # Add all sensor temperatures
+        'heating_blocked': controller.heating_blocked,
+        'cooling_blocked': controller.cooling_blocked,
+        'min_temp': controller.min_temp,
+        'control_enabled': control_enabled,
+        'light_on': light_on
+    }
+
 # --- Control Loop ---
+# Set while control is enabled; the loop parks on it instead of waking once
+# a second just to find control disabled
+_run_control = threading.Event()
+if control_enabled:
+    _run_control.set()
+
+# Notified by the polling thread after each snapshot publish, so the control
+# loop reacts to fresh data immediately instead of polling for it
+_sensor_update_cv = threading.Condition()
+
 def control_loop():
     """Background thread that controls heating/cooling relays - uses cached sensor data"""
     print("Control loop started")
+    last_error_time = 0.0
     while True:
         try:
-            if control_enabled:
-                # Get all sensors from cache (non-blocking) for frost protection
-                sensors = get_all_sensors()
-                
-                # Get sensor IDs from settings
-                room_id = settings.get('room_sensor_id', '28-mock001')
-                safety_id = settings.get('safety_sensor_id', '')
-                
-                room_temp = None
-                safety_temp = None
-                all_temps = []
-                
-                for sensor in sensors:
-                    sensor_id = sensor.get('id', '')
-                    temp = sensor.get('temperature', None)
-                    if temp is not None:
-                        all_temps.append(temp)
-                    if sensor_id == room_id:
-                        room_temp = temp
-                    elif safety_id and sensor_id == safety_id:
-                        safety_temp = temp
-                
-                # Update the relays based on current temperature with frost protection
-                controller.update_relays(room_temp, safety_temp, all_temps)
-            else:
-                # If control is disabled, turn off both relays and reset state
-                from control import GPIO, HEAT_PIN, COOL_PIN
+            if not _run_control.is_set():
+                # Control just got disabled: turn off both relays, reset
+                # state, then park until it is re-enabled instead of
+                # spinning through no-op ticks
                 if controller.current_state != 'idle':
-                    GPIO.output(HEAT_PIN, GPIO.LOW)
-                    GPIO.output(COOL_PIN, GPIO.LOW)
+                    RELAY_GPIO.output(HEAT_PIN, RELAY_GPIO.LOW)
+                    RELAY_GPIO.output(COOL_PIN, RELAY_GPIO.LOW)
                     controller.is_heating = False
                     controller.is_cooling = False
                     controller.current_state = 'idle'
                     print("Control disabled - relays OFF, state reset to idle")
+                _run_control.wait()
+                continue
+
+            # Everything the controller needs was resolved at refresh
+            # time - one snapshot load per tick, no per-tick iteration
+            snap = control_snapshot
+            room_temp, safety_temp, all_temps = snap[1], snap[2], snap[3]
+
+            # Update the relays based on current temperature with frost protection
+            controller.update_relays(room_temp, safety_temp, all_temps)
+        except (OSError, RuntimeError, ValueError, TypeError) as e:
+            # Known failure modes (GPIO access, bad sensor values). Rate-limit
+            # the output: a persistent fault would otherwise emit a blocking
+            # TTY write every tick
+            now = time.monotonic()
+            if now - last_error_time >= 60:
+                print(f"Error in control loop: {e}")
+                last_error_time = now
         except Exception as e:
-            print(f"Error in control loop: {e}")
-        
-        time.sleep(1)  # Check every 1 second for faster response
+            # Anything unexpected: keep the relay thread alive (letting it
+            # die could leave a relay latched on), but make it loud
+            now = time.monotonic()
+            if now - last_error_time >= 60:
+                print(f"Unexpected error in control loop: {e}")
+                traceback.print_exc()
+                last_error_time = now
+
+        # Sleep until the poller publishes a new snapshot; the 5s timeout is
+        # a safety net so frost protection still runs if the poller stalls
+        with _sensor_update_cv:
+            _sensor_update_cv.wait(timeout=5.0)
 
 # Start control loop in background thread
 control_thread = threading.Thread(target=control_loop, daemon=True)
@@ -306,45 +708,75 @@ control_thread.start()
 # --- Sensor Polling Thread ---
 _last_log_time = 0  # Track last temperature log time
 LOG_INTERVAL = 60  # Only log temperature data every 60 seconds
+_first_poll_ready = threading.Event()  # Set after the first snapshot publish
 
 def sensor_polling_loop():
     """Background thread that polls sensors every 20s and updates cache"""
     print("Sensor polling thread started - updating cache every 20 seconds")
     global watchdog_timestamp, _last_log_time
-    
+
+    pending = None  # Outstanding read future, kept across ticks on timeout
     while True:
         try:
-            # Read all sensors for comprehensive data
-            sensors, error = _run_with_timeout(read_sensors, 15.0)
-            
+            # Read all sensors for comprehensive data. If the previous read
+            # timed out, wait on the same future instead of queueing another
+            # job behind the stuck worker.
+            if pending is None:
+                pending = _sensor_executor.submit(read_sensors)
+            try:
+                sensors = pending.result(timeout=15.0)
+                error = None
+                pending = None
+            except FutureTimeoutError:
+                sensors = None
+                error = TimeoutError("read_sensors timed out after 15s - worker still running")
+            except Exception as e:
+                sensors = None
+                error = e
+                pending = None
+
             if error:
                 print(f"Warning: sensor polling failed: {error}")
             elif sensors:
-                # Update display cache with all sensors
-                with display_cache['lock']:
-                    display_cache['data'] = sensors
-                    display_cache['timestamp'] = time.time()
+                # Build the id -> temperature index once per refresh so
+                # readers don't re-scan the sensor list on every call
+                by_id = {s.get('id', ''): s.get('temperature') for s in sensors}
+
+                # Publish a fresh display snapshot (atomic tuple swap)
+                global display_snapshot, control_snapshot
+                display_snapshot = (sensors, by_id, time.monotonic())
                 
                 # Update control cache with filtered sensors (Room + Safety only)
-                room_id = settings.get('room_sensor_id', '28-mock001')
-                safety_id = settings.get('safety_sensor_id', '')
-                
-                control_sensors = [s for s in sensors if s.get('id') in [room_id, safety_id]]
-                
-                with control_cache['lock']:
-                    control_cache['data'] = control_sensors
-                    control_cache['timestamp'] = time.time()
+                room_id = room_sensor_id
+                safety_id = safety_sensor_id
+
+                control_sensors = [s for s in sensors if s.get('id') in control_sensor_ids]
+
+                control_snapshot = (control_sensors,
+                                    by_id.get(room_id),
+                                    by_id.get(safety_id) if safety_id else None,
+                                    [t for t in by_id.values() if t is not None],
+                                    time.monotonic())
                 
-                watchdog_timestamp = time.time()
+                watchdog_timestamp = time.monotonic()
+                _first_poll_ready.set()  # Unblock startup after the first publish
+
+                # Wake the control loop so it acts on the fresh snapshot now
+                with _sensor_update_cv:
+                    _sensor_update_cv.notify_all()
                 print(f"Sensor cache updated: {len(sensors)} total, {len(control_sensors)} for control")
+
+                # Push the fresh status to SSE clients so the UI doesn't
+                # need to poll /api/status and /api/temps between refreshes
+                notify_clients('status_update', build_status())
                 
                 # Log readings for histogram - only every LOG_INTERVAL seconds
-                current_time = time.time()
+                current_time = time.monotonic()
                 if current_time - _last_log_time >= LOG_INTERVAL:
                     try:
                         log_temperature_data(sensors)
                         _last_log_time = current_time
-                        print(f"Temperature data logged at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                        print(f"Temperature data logged at {_fmt_ts()}")
                     except Exception as e:
                         print(f"Error logging temperature data: {e}")
             else:
@@ -352,7 +784,6 @@ def sensor_polling_loop():
                 
         except Exception as e:
             print(f"Error in sensor polling loop: {e}")
-            import traceback
             traceback.print_exc()
         
         # Wait 20 seconds before next poll
@@ -362,14 +793,13 @@ def sensor_polling_loop():
 sensor_thread = threading.Thread(target=sensor_polling_loop, daemon=True)
 sensor_thread.start()
 
-# Wait briefly for initial sensor data
+# Wait briefly for initial sensor data - the poller sets the event right
+# after its first snapshot, so startup resumes immediately instead of on
+# the next whole-second poll
 print("Waiting for initial sensor data...")
-for i in range(30):  # Wait up to 30 seconds
-    with control_cache['lock']:
-        if control_cache['data'] is not None:
-            print(f"Initial sensor data loaded after {i+1} seconds")
-            break
-    time.sleep(1)
+_t0 = time.monotonic()
+if _first_poll_ready.wait(timeout=30.0):
+    print(f"Initial sensor data loaded after {time.monotonic() - _t0:.1f} seconds")
 else:
     print("Warning: Timed out waiting for initial sensor data, continuing anyway")
 
@@ -377,27 +807,53 @@ else:
 cleanup_thread = threading.Thread(target=cleanup_loop, daemon=True)
 cleanup_thread.start()
 
+# Start debounced state writer in background thread
+state_flush_thread = threading.Thread(target=state_flush_loop, daemon=True)
+state_flush_thread.start()
+
 # --- API Endpoints ---
+# Pre-encoded bodies for the high-rate polling endpoints: /api/light GET has
+# only two possible responses, and /api/watchdog changes at most once per
+# one-second tick
+_LIGHT_BODIES = {True: b'{"on":true}', False: b'{"on":false}'}
+_watchdog_cache = {'tick': None, 'body': None}
+
 @app.route('/api/watchdog', methods=['GET'])
 def api_watchdog():
     """Watchdog endpoint to check if backend is responsive"""
-    global watchdog_timestamp
-    current_time = time.time()
+    current_time = time.monotonic()
+    # The UI polls this every second; reuse the serialized body within the
+    # same one-second tick instead of rebuilding dict + JSON per client
+    tick = int(current_time)
+    if _watchdog_cache['tick'] == tick:
+        return Response(_watchdog_cache['body'], mimetype='application/json')
     time_since_update = current_time - watchdog_timestamp
     is_healthy = time_since_update < 15  # Considered unhealthy if no updates for 15 seconds (increased for slow sensor reads)
-    return jsonify({
+    payload = {
         'healthy': is_healthy,
         'last_update': watchdog_timestamp,
         'time_since_update': time_since_update,
-        'timestamp': current_time
-    }), 200
+        'timestamp': time.time()  # Wall clock only at the reporting boundary
+    }
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(',', ':')).encode()
+    _watchdog_cache['tick'] = tick
+    _watchdog_cache['body'] = body
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/light', methods=['POST'])
 def api_light():
     global light_on
-    data = request.json
+    data = get_request_json()
     on = data.get('on', False)
-    light_on = bool(on)
+    requested = bool(on)
+    if requested == light_on:
+        # Already in the requested state - skip the GPIO write, the state
+        # file save and the SSE broadcast (same gate update_relays uses)
+        return jsonify({'on': light_on}), 200
+    light_on = requested
     print(f"Light API called: on={light_on}, setting GPIO to {'HIGH' if light_on else 'LOW'}")
     # Direct logic for active-HIGH relay modules
     GPIO.output(LIGHT_PIN, GPIO.HIGH if light_on else GPIO.LOW)
@@ -409,19 +865,54 @@ def api_light():
 
 @app.route('/api/light', methods=['GET'])
 def api_get_light():
-    return jsonify({'on': light_on}), 200
+    # Only two possible bodies - serve constant pre-encoded bytes
+    return Response(_LIGHT_BODIES[bool(light_on)], mimetype='application/json')
+
+# Resolve the shutdown command once at import: shutil.which pays the PATH
+# search up front, so the handler itself is a single fork with absolute paths.
+# This must stay `shutdown -h now` - that is the command the README tells
+# operators to whitelist in sudoers, so existing installs keep working.
+def _which_shutdown():
+    found = shutil.which('shutdown')
+    if found:
+        return found
+    # Service users often run without the sbin dirs in PATH
+    for candidate in ('/usr/sbin/shutdown', '/sbin/shutdown'):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+SHUTDOWN_CMD = None
+_sudo = shutil.which('sudo')
+_shutdown = _which_shutdown()
+if _sudo and _shutdown:
+    SHUTDOWN_CMD = [_sudo, _shutdown, '-h', 'now']
+else:
+    print("Warning: sudo/shutdown not found - /api/shutdown disabled")
 
 @app.route('/api/shutdown', methods=['POST'])
 def api_shutdown():
-    subprocess.Popen(['sudo', 'shutdown', '-h', 'now'])
+    if SHUTDOWN_CMD is None:
+        return jsonify({'error': 'shutdown command not available'}), 503
+    # Popen returns as soon as the child is forked, so the response goes
+    # out without waiting on the shutdown machinery. close_fds=False skips
+    # the fd-table walk and the new session detaches the child from this
+    # process group before systemd tears us down.
+    subprocess.Popen(SHUTDOWN_CMD, close_fds=False, start_new_session=True)
     return jsonify({'status': 'shutting down'}), 200
 
 @app.route('/api/control_enable', methods=['POST'])
 def api_control_enable():
     global control_enabled
-    data = request.json
+    data = get_request_json()
     enabled = data.get('enabled', True)
     control_enabled = bool(enabled)
+    # Wake the parked control loop, or let it run one more tick to switch
+    # the relays off and park itself
+    if control_enabled:
+        _run_control.set()
+    else:
+        _run_control.clear()
     save_control_enabled(control_enabled)
     # Notify all clients
     notify_clients('control_enable_changed', {'enabled': control_enabled})
@@ -433,13 +924,12 @@ def api_get_offsets():
         return jsonify(get_offsets())
     except Exception as e:
         print(f"Error in /api/offsets GET: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({}), 200  # Return empty dict instead of failing
 
 @app.route('/api/offsets', methods=['POST'])
 def api_set_offset():
-    data = request.json
+    data = get_request_json()
     sensor_id = data.get('sensor_id')
     offset = data.get('offset')
     if sensor_id is not None and offset is not None:
@@ -447,34 +937,35 @@ def api_set_offset():
         return jsonify({'sensor_id': sensor_id, 'offset': float(offset)}), 200
     return jsonify({'error': 'Missing sensor_id or offset'}), 400
 
+# Like the /api/status body cache: the temps payloads only change when the
+# poller publishes a new snapshot (or names/assignments change), so all
+# readers between refreshes share one pre-encoded body
+_temps_cache = {'key': None, 'body': None}
+_temps_named_cache = {'key': None, 'body': None}
+
 @app.route('/api/temps')
 def get_temps():
-    try:
-        # Use display cache - all sensors, updated every 10 seconds
-        sensors = get_all_sensors()
-        # Convert list to dictionary for backwards compatibility
-        temps = {}
-        for sensor in sensors:
-            temps[sensor['id']] = sensor['temperature']
-        return jsonify(temps)
-    except Exception as e:
-        print(f"Error in /api/temps: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+    # The polling thread already builds the id -> temperature index once per
+    # refresh; between refreshes every request shares one encoded body
+    key = display_snapshot[2]
+    if _temps_cache['key'] != key:
+        _temps_cache['body'] = _encode_json(get_sensor_index())
+        _temps_cache['key'] = key
+    return Response(_temps_cache['body'], mimetype='application/json')
 
 @app.route('/api/temps_named')
 def get_temps_named():
     """Return temperatures with names from settings"""
     try:
-        # Try to get sensors with a very short wait - prefer cached data
-        sensors = get_all_sensors()
-        if not sensors:
-            # Return empty dict instead of error to keep UI responsive
-            return jsonify({})
-        
         sensor_names = settings.get('sensor_names', {})
-        safety_sensor_id = settings.get('safety_sensor_id', '')
+        # Rebuild only when the snapshot, the name mapping or the safety
+        # assignment changed; the name dict is tiny so the tuple key is cheap
+        key = (display_snapshot[2], safety_sensor_id,
+               tuple(sorted(sensor_names.items())))
+        if _temps_named_cache['key'] == key:
+            return Response(_temps_named_cache['body'], mimetype='application/json')
+
+        sensors = get_all_sensors()
         temps_by_name = {}
         for sensor in sensors:
             sensor_id = sensor['id']
@@ -484,17 +975,19 @@ def get_temps_named():
             # Also include safety sensor explicitly if configured
             if safety_sensor_id and sensor_id == safety_sensor_id:
                 temps_by_name['Safety'] = sensor['temperature']
-        return jsonify(temps_by_name)
+        body = _encode_json(temps_by_name)
+        _temps_named_cache['body'] = body
+        _temps_named_cache['key'] = key
+        return Response(body, mimetype='application/json')
     except Exception as e:
         print(f"Error in /api/temps_named: {e}")
-        import traceback
         traceback.print_exc()
         # Return empty dict instead of 500 to keep UI responsive
         return jsonify({})
 
 @app.route('/api/control', methods=['POST'])
 def set_control():
-    data = request.json
+    data = get_request_json()
     target = data.get('target')
     deviation = data.get('deviation')
     changed = False
@@ -536,22 +1029,26 @@ def get_control():
 @app.route('/api/sensor_assignments', methods=['POST'])
 def set_sensor_assignments():
     """Update which sensors are assigned to room and safety roles"""
-    data = request.json
+    data = get_request_json()
     room_id = data.get('room_sensor_id')
     safety_id = data.get('safety_sensor_id')
-    
+
+    global room_sensor_id, safety_sensor_id, control_sensor_ids
     if room_id:
         settings['room_sensor_id'] = room_id
+        room_sensor_id = room_id
     if safety_id:
         settings['safety_sensor_id'] = safety_id
-    
+        safety_sensor_id = safety_id
+    control_sensor_ids = _control_id_set()
+
     save_settings(settings)
-    
-    # Clear caches to force re-read with new sensor assignments
-    with control_cache['lock']:
-        control_cache['data'] = None
-        control_cache['timestamp'] = None
-    
+
+    # Clear the control snapshot to force re-resolution with the new
+    # sensor assignments on the next poll (atomic swap)
+    global control_snapshot
+    control_snapshot = (None, None, None, [], None)
+
     return jsonify({
         'room_sensor_id': settings.get('room_sensor_id'),
         'safety_sensor_id': settings.get('safety_sensor_id')
@@ -560,7 +1057,7 @@ def set_sensor_assignments():
 @app.route('/api/sensor_name', methods=['POST'])
 def set_sensor_name():
     """Update a sensor's display name in settings"""
-    data = request.json
+    data = get_request_json()
     sensor_id = data.get('sensor_id')
     name = data.get('name', '')
     
@@ -576,75 +1073,45 @@ def set_sensor_name():
 @app.route('/api/status')
 def get_status():
     try:
-        # Get all sensors for display - prefer cached data for speed
-        sensors = get_all_sensors()
-        room_temp = None
-        safety_temp = None
-        all_temps = {}
-        
-        # Get sensor IDs from settings
-        room_id = settings.get('room_sensor_id', '28-mock001')
-        safety_id = settings.get('safety_sensor_id', '')
-        sensor_names = settings.get('sensor_names', {})
-        
-        if sensors:  # Only process if we have sensor data
-            for sensor in sensors:
-                sensor_id = sensor.get('id', '')
-                temp = sensor.get('temperature', None)
-                # Build all temps dictionary with names
-                name = sensor_names.get(sensor_id, sensor_id)
-                all_temps[name] = temp
-                
-                if sensor_id == room_id:
-                    room_temp = temp
-                elif safety_id and sensor_id == safety_id:
-                    safety_temp = temp
-        
-        # Return ACTUAL controller state, not recalculated values
-        status = {
-            'should_heat': controller.is_heating if control_enabled else False,
-            'should_cool': controller.is_cooling if control_enabled else False,
-            'current_state': controller.current_state if control_enabled else 'idle',
-            'target': controller.target,
-            'deviation': controller.deviation,
-            'room_temp': room_temp,
-            'safety_temp': safety_temp,
-            'temps': all_temps,  # Add all sensor temperatures
-            'heating_blocked': controller.heating_blocked,
-            'cooling_blocked': controller.cooling_blocked,
-            'min_temp': controller.min_temp,
-            'control_enabled': control_enabled,
-            'light_on': light_on
-        }
-        return jsonify(status)
+        return Response(get_status_body(), mimetype='application/json')
     except Exception as e:
         print(f"Error in /api/status: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 # --- Server-Sent Events Endpoint ---
+# Each SSE connection pins one waitress worker thread for its lifetime
+# (the generator blocks in Queue.get), so the client count must stay well
+# below the server's thread pool or plain endpoints stop being served
+MAX_SSE_CLIENTS = 8
+
 @app.route('/api/events')
 def sse_events():
     """Server-Sent Events endpoint for real-time updates"""
+    with sse_lock:
+        if len(sse_clients) >= MAX_SSE_CLIENTS:
+            # Tell the extra dashboard to fall back to polling instead of
+            # letting it exhaust the worker pool
+            return jsonify({'error': 'too many event stream clients'}), 503
+
     def event_stream():
         client_queue = Queue(maxsize=10)
+        cid = id(client_queue)
         with sse_lock:
-            sse_clients.append(client_queue)
+            sse_clients[cid] = client_queue
         try:
             while True:
                 try:
-                    # Wait for events with timeout to send periodic heartbeats
-                    event = client_queue.get(timeout=30)
-                    yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+                    # Wait for events with timeout to send periodic heartbeats;
+                    # frames are pre-encoded by notify_clients
+                    yield client_queue.get(timeout=30)
                 except Empty:
                     # Send heartbeat comment to keep connection alive
                     yield ": heartbeat\n\n"
         except GeneratorExit:
             # Client disconnected
             with sse_lock:
-                if client_queue in sse_clients:
-                    sse_clients.remove(client_queue)
+                sse_clients.pop(cid, None)
     
     return Response(event_stream(), mimetype='text/event-stream',
                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -673,68 +1140,191 @@ def health_check():
 def history():
     return render_template('history.html')
 
-@app.route('/api/history')
-def api_history():
-    log_file = 'temperature_log.csv'
-    data = []
+# Cache of the last serialized /api/history body, keyed on the log file's
+# (mtime_ns, size) plus the requested window. The history page polls the same
+# window repeatedly, so between log writes this turns a full parse into a
+# dict lookup.
+_history_cache = {'key': None, 'body': None}
+_history_cache_lock = threading.Lock()
+
+# Incrementally parsed history rows as (timestamp, name, temperature) tuples,
+# plus a parallel timestamp list for bisecting. We remember the byte offset of
+# the last parse and only read what the logger appended since, so the first
+# request after a log write costs O(new bytes) instead of re-parsing the whole
+# file. 'sorted' tracks whether the timestamps are actually monotonic -
+# appends usually are, but old logs have out-of-order blocks and a wall-clock
+# step on an RTC-less Pi can stamp rows backwards. Guarded by
+# _history_cache_lock.
+_history_rows = {'offset': 0, 'mtime_ns': 0, 'rows': [], 'ts': [], 'sorted': True}
+
+def refresh_history_rows(log_file):
+    """Append newly logged CSV rows to the in-memory history row cache"""
     sensor_names = settings.get('sensor_names', {})
-    
-    # Get date range parameters (in days offset from today)
-    days_back = int(request.args.get('days_back', 0))
-    days_range = int(request.args.get('days_range', 7))
-    
-    # Calculate timestamp range
-    end_date = datetime.now() - timedelta(days=days_back)
-    start_date = end_date - timedelta(days=days_range)
-    
-    start_timestamp = int(start_date.timestamp())
-    end_timestamp = int(end_date.timestamp())
-    
     try:
-        with open(log_file, 'r') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                # Skip empty rows
-                if not row or len(row) < 3:
+        st = os.stat(log_file)
+    except OSError:
+        print("Temperature log file not found")
+        _history_rows['offset'] = 0
+        _history_rows['mtime_ns'] = 0
+        _history_rows['rows'] = []
+        _history_rows['ts'] = []
+        _history_rows['sorted'] = True
+        return
+
+    # File shrank or was replaced (nightly cleanup rewrites it): start over
+    if st.st_size < _history_rows['offset']:
+        _history_rows['offset'] = 0
+        _history_rows['rows'] = []
+        _history_rows['ts'] = []
+        _history_rows['sorted'] = True
+
+    if st.st_size == _history_rows['offset']:
+        _history_rows['mtime_ns'] = st.st_mtime_ns
+        return
+
+    rows = _history_rows['rows']
+    ts_index = _history_rows['ts']
+    # Remember where this parse started: the offset is only advanced after
+    # a complete parse, so on failure any rows appended so far must be
+    # rolled back or the retry would serve them duplicated
+    n_committed = len(rows)
+    try:
+        with open(log_file, 'r', buffering=1 << 20, newline='') as f:
+            f.seek(_history_rows['offset'])
+            for row in csv.reader(f):
+                # Skip empty/short rows
+                if len(row) < 3:
                     continue
-                
                 try:
                     # Handle both 3-column and 4-column CSV formats
                     # Format 1 (old): timestamp, sensor_id, temperature
                     # Format 2 (current): timestamp, old_id, name, temperature
                     if len(row) == 4:
-                        # 4-column format: timestamp, old_id, name, temperature
                         ts = int(row[0])
                         name = row[2]  # Use the name from column 3
                         temp = float(row[3]) if row[3] else None
                     else:
-                        # 3-column format: timestamp, sensor_id, temperature
                         ts = int(row[0])
-                        sensor_id = row[1]
                         # Map sensor ID to name
-                        name = sensor_names.get(sensor_id, sensor_id)
+                        name = sensor_names.get(row[1], row[1])
                         temp = float(row[2]) if row[2] else None
-                    
-                    # Only include data within the specified date range
-                    if start_timestamp <= ts <= end_timestamp:
-                        data.append({
-                            'timestamp': ts,
-                            'name': name,
-                            'temperature': temp
-                        })
                 except (ValueError, IndexError) as e:
                     # Skip malformed rows
                     print(f"Skipping malformed row: {row}, error: {e}")
                     continue
-                    
-    except FileNotFoundError:
-        print("Temperature log file not found")
+                if ts_index and ts < ts_index[-1]:
+                    _history_rows['sorted'] = False
+                rows.append((ts, name, temp))
+                ts_index.append(ts)
+            _history_rows['offset'] = f.tell()
+        _history_rows['mtime_ns'] = st.st_mtime_ns
     except Exception as e:
+        del rows[n_committed:]
+        del ts_index[n_committed:]
         print(f"Error reading history data: {e}")
-        import traceback
         traceback.print_exc()
-    
-    return jsonify(data)
+
+@app.route('/api/history')
+def api_history():
+    log_file = 'temperature_log.csv'
+
+    # Get date range parameters (in days offset from today)
+    days_back = int(request.args.get('days_back', 0))
+    days_range = int(request.args.get('days_range', 7))
+
+    # Calculate timestamp range
+    end_date = datetime.now() - timedelta(days=days_back)
+    start_date = end_date - timedelta(days=days_range)
+
+    start_timestamp = int(start_date.timestamp())
+    end_timestamp = int(end_date.timestamp())
+
+    # Optional tail mode: ?since=<ts> returns only rows newer than the given
+    # timestamp, so an incremental poller fetches just the delta instead of
+    # re-downloading the whole window
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            start_timestamp = max(start_timestamp, int(since) + 1)
+        except ValueError:
+            pass
+
+    # Optional cap on response size: ?limit=N keeps only the newest N rows
+    # in the window, bounding the payload no matter how wide the range is
+    try:
+        limit = int(request.args.get('limit', 0))
+    except ValueError:
+        limit = 0
+
+    # Serve the pre-serialized body if the log file hasn't changed since the
+    # last request for the same window
+    try:
+        st = os.stat(log_file)
+        cache_key = (st.st_mtime_ns, st.st_size, days_back, days_range, since, limit)
+        etag = f'{st.st_mtime_ns:x}-{st.st_size:x}'
+    except OSError:
+        cache_key = None
+        etag = None
+
+    # An unchanged poll collapses to a ~200-byte 304 instead of the full body
+    if etag is not None and request.if_none_match.contains(etag):
+        return Response(status=304)
+
+    def make_response(body):
+        resp = Response(body, mimetype='application/json')
+        if etag is not None:
+            resp.set_etag(etag)
+        return resp
+
+    if cache_key is not None and _history_cache['key'] == cache_key:
+        return make_response(_history_cache['body'])
+
+    def build_body():
+        # The bisect below requires monotonic timestamps; logs with
+        # out-of-order blocks (or a wall-clock step on an RTC-less Pi)
+        # are sorted once here and stay sorted for every later request.
+        # Timsort is near-linear on the almost-sorted common case.
+        if not _history_rows['sorted']:
+            _history_rows['rows'].sort(key=lambda r: r[0])
+            _history_rows['ts'] = [r[0] for r in _history_rows['rows']]
+            _history_rows['sorted'] = True
+        # The cached rows are now sorted by timestamp: locate the window
+        # bounds with two binary searches on the parallel timestamp list
+        # and slice, instead of testing every row against the range
+        ts_index = _history_rows['ts']
+        lo = bisect.bisect_left(ts_index, start_timestamp)
+        hi = bisect.bisect_right(ts_index, end_timestamp)
+        if limit > 0 and hi - lo > limit:
+            # Keep only the newest N rows in the window
+            lo = hi - limit
+        rows = _history_rows['rows'][lo:hi]
+        # Columnar layout: three parallel arrays instead of one dict per
+        # row. The sensor names repeat on every reading, so this roughly
+        # halves the payload and skips building thousands of tiny dicts.
+        timestamps = []
+        names = []
+        temps = []
+        for ts, name, temp in rows:
+            timestamps.append(ts)
+            names.append(name)
+            temps.append(temp)
+        payload = {'timestamp': timestamps, 'name': names, 'temperature': temps}
+        if orjson is not None:
+            return orjson.dumps(payload)
+        return json.dumps(payload, separators=(',', ':'))
+
+    # Double-checked locking so concurrent requests don't all re-parse the
+    # new log rows; whoever gets the lock first builds the body for everyone
+    with _history_cache_lock:
+        if cache_key is not None and _history_cache['key'] == cache_key:
+            return make_response(_history_cache['body'])
+        refresh_history_rows(log_file)
+        body = build_body()
+        if cache_key is not None:
+            _history_cache['key'] = cache_key
+            _history_cache['body'] = body
+
+    return make_response(body)
 
 @app.route('/settings')
 def settings_page():
@@ -743,6 +1333,16 @@ def settings_page():
 if __name__ == "__main__":
     # Allow port to be configured via environment variable for development
     port = int(os.environ.get('FLASK_PORT', 5000))
-    # Enable threading to handle multiple concurrent requests
-    app.run(host='0.0.0.0', port=port, debug=True, threaded=True)
+    try:
+        # Production WSGI server: proper thread pool, no debugger/reloader
+        # overhead on every request
+        from waitress import serve
+        print(f"Serving with waitress on 0.0.0.0:{port}")
+        # SSE connections each hold a worker for their lifetime, so keep
+        # the pool comfortably above MAX_SSE_CLIENTS for normal requests
+        serve(app, host='0.0.0.0', port=port, threads=16)
+    except ImportError:
+        # Fall back to the Werkzeug dev server if waitress isn't installed
+        print("waitress not installed - falling back to Flask dev server")
+        app.run(host='0.0.0.0', port=port, threaded=True)
 
@@ -15,17 +15,47 @@ except (ImportError, RuntimeError):
         def setwarnings(self, *a, **kw): pass
     GPIO = MockGPIO()
 import atexit
+import logging
+import logging.handlers
+import queue
+
+# Log records are handed to a background listener thread that owns the
+# stream handler, so a slow stdout pipe (journald under load) never blocks
+# the control loop. The queue is bounded; QueueHandler drops on overflow
+# rather than stalling the caller.
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _log_queue = queue.Queue(maxsize=1000)
+    _log_listener = logging.handlers.QueueListener(
+        _log_queue, logging.StreamHandler())
+    _log_listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    logger.setLevel(logging.INFO)
+    atexit.register(_log_listener.stop)
 
 TARGET_TEMP = 12.0  # Example target temperature in Celsius
 DEFAULT_DEVIATION = 0.5  # Default deadband in Celsius
 HEAT_PIN = 17  # GPIO 17 (physical pin 11)
 COOL_PIN = 27  # GPIO 27 (physical pin 13)
 
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(HEAT_PIN, GPIO.OUT, initial=GPIO.LOW)
-GPIO.setup(COOL_PIN, GPIO.OUT, initial=GPIO.LOW)
+# Guarded so a second import path (test harness, blueprint split) cannot
+# re-run the pin setup; the flag lives on the GPIO module itself so every
+# copy of this code coordinates on the same marker
+if not getattr(GPIO, '_vino_relays_initialized', False):
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(HEAT_PIN, GPIO.OUT, initial=GPIO.LOW)
+    GPIO.setup(COOL_PIN, GPIO.OUT, initial=GPIO.LOW)
+    GPIO._vino_relays_initialized = True
+
+_gpio_cleaned = False
 
 def cleanup_gpio():
+    # Idempotent: atexit may run this alongside other registered cleanups,
+    # and GPIO.cleanup() after the channels are freed raises warnings
+    global _gpio_cleaned
+    if _gpio_cleaned:
+        return
+    _gpio_cleaned = True
     GPIO.output(HEAT_PIN, GPIO.LOW)
     GPIO.output(COOL_PIN, GPIO.LOW)
     GPIO.cleanup()
@@ -33,9 +63,18 @@ atexit.register(cleanup_gpio)
 
 
 class TempController:
+    # Fixed attribute set: slot access skips the per-instance dict lookup
+    # that update_relays would otherwise pay on every tick, and drops the
+    # dict itself (~200 bytes per instance)
+    __slots__ = ('_target', '_deviation', '_heat_threshold', '_cool_threshold',
+                 'safety_sensor_name', 'safety_off',
+                 'safety_on', 'heating_blocked', 'cooling_blocked', 'min_temp',
+                 'current_state', 'is_heating', 'is_cooling')
+
     def __init__(self, target=TARGET_TEMP, deviation=DEFAULT_DEVIATION, safety_sensor_name=None, safety_off=28.0, safety_on=25.0):
-        self.target = target
-        self.deviation = deviation
+        self._target = target
+        self._deviation = deviation
+        self._recompute_thresholds()
         self.safety_sensor_name = safety_sensor_name
         self.safety_off = safety_off
         self.safety_on = safety_on
@@ -46,6 +85,30 @@ class TempController:
         self.is_heating = False  # Actual GPIO state
         self.is_cooling = False  # Actual GPIO state
 
+    # target and deviation only change on setpoint updates, so the band
+    # edges are computed once in the setters instead of on every tick
+    def _recompute_thresholds(self):
+        self._heat_threshold = self._target - self._deviation
+        self._cool_threshold = self._target + self._deviation
+
+    @property
+    def target(self):
+        return self._target
+
+    @target.setter
+    def target(self, value):
+        self._target = value
+        self._recompute_thresholds()
+
+    @property
+    def deviation(self):
+        return self._deviation
+
+    @deviation.setter
+    def deviation(self, value):
+        self._deviation = value
+        self._recompute_thresholds()
+
     def should_heat(self, current_temp, safety_temp=None):
         # Safety logic: block heating if safety sensor is above threshold
         if safety_temp is not None:
@@ -63,10 +126,10 @@ class TempController:
         
         if self.is_heating:
             # If already heating, continue until target is reached
-            return current_temp < self.target
+            return current_temp < self._target
         else:
             # Start heating when below target - deviation
-            return current_temp < self.target - self.deviation
+            return current_temp < self._heat_threshold
 
     def check_frost_protection(self, all_temps):
         """Frost protection: block cooling if any sensor is at/below 0°C, unblock when all above 5°C"""
@@ -86,16 +149,17 @@ class TempController:
         # Block cooling if any sensor at or below 0°C
         if min_temp <= 0.0:
             if not self.cooling_blocked:
-                print(f"⚠️ FROST PROTECTION ACTIVATED: Min temp {min_temp}°C <= 0°C - Cooling blocked until all sensors reach 5°C")
+                logger.info("⚠️ FROST PROTECTION ACTIVATED: Min temp %s°C <= 0°C - Cooling blocked until all sensors reach 5°C", min_temp)
             self.cooling_blocked = True
         # Unblock cooling only when all sensors above 5°C (hysteresis)
         elif min_temp >= 5.0:
             if self.cooling_blocked:
-                print(f"✓ FROST PROTECTION DEACTIVATED: Min temp {min_temp}°C >= 5°C - Cooling unblocked")
+                logger.info("✓ FROST PROTECTION DEACTIVATED: Min temp %s°C >= 5°C - Cooling unblocked", min_temp)
             self.cooling_blocked = False
-        # Between 0-5°C: maintain current state (hysteresis)
+        # Between 0-5°C: maintain current state (hysteresis); this one fires
+        # every tick while in the band, so keep it at DEBUG
         elif self.cooling_blocked:
-            print(f"⚠️ FROST PROTECTION ACTIVE: Min temp {min_temp}°C - Waiting for 5°C to re-enable cooling")
+            logger.debug("⚠️ FROST PROTECTION ACTIVE: Min temp %s°C - Waiting for 5°C to re-enable cooling", min_temp)
 
     def should_cool(self, current_temp):
         # Check frost protection first
@@ -109,10 +173,10 @@ class TempController:
         
         if self.is_cooling:
             # If already cooling, continue until target is reached
-            return current_temp > self.target
+            return current_temp > self._target
         else:
             # Start cooling when above target + deviation
-            return current_temp > self.target + self.deviation
+            return current_temp > self._cool_threshold
 
     def update_relays(self, current_temp, safety_temp=None, all_temps=None):
         # Check frost protection with all sensor temperatures
@@ -133,25 +197,29 @@ class TempController:
         
         # Only update GPIOs if state changes
         if desired_state != self.current_state:
-            print(f"State change: {self.current_state} -> {desired_state} (temp={current_temp}, target={self.target}, dev={self.deviation}, safety={safety_temp}, heating_blocked={self.heating_blocked}, cooling_blocked={self.cooling_blocked})")
+            # %s-style args: formatting is deferred to the listener thread
+            # and skipped entirely if the level is filtered out
+            logger.info("State change: %s -> %s (temp=%s, target=%s, dev=%s, safety=%s, heating_blocked=%s, cooling_blocked=%s)",
+                        self.current_state, desired_state, current_temp, self.target, self.deviation,
+                        safety_temp, self.heating_blocked, self.cooling_blocked)
             
             if desired_state == 'heating':
                 GPIO.output(HEAT_PIN, GPIO.HIGH)
                 GPIO.output(COOL_PIN, GPIO.LOW)
                 self.is_heating = True
                 self.is_cooling = False
-                print(f"HEATING ON (GPIO {HEAT_PIN} = HIGH)")
+                logger.info("HEATING ON (GPIO %s = HIGH)", HEAT_PIN)
             elif desired_state == 'cooling':
                 GPIO.output(HEAT_PIN, GPIO.LOW)
                 GPIO.output(COOL_PIN, GPIO.HIGH)
                 self.is_heating = False
                 self.is_cooling = True
-                print(f"COOLING ON (GPIO {COOL_PIN} = HIGH)")
+                logger.info("COOLING ON (GPIO %s = HIGH)", COOL_PIN)
             else:  # idle
                 GPIO.output(HEAT_PIN, GPIO.LOW)
                 GPIO.output(COOL_PIN, GPIO.LOW)
                 self.is_heating = False
                 self.is_cooling = False
-                print(f"IDLE - Both relays OFF")
+                logger.info("IDLE - Both relays OFF")
             
             self.current_state = desired_state
@@ -76,8 +76,8 @@ echo ""
 
 # Install Python dependencies
 echo "Step 5: Installing Python dependencies..."
-sudo -u "$ACTUAL_USER" pip3 install --break-system-packages Flask RPi.GPIO 2>/dev/null || \
-sudo -u "$ACTUAL_USER" pip3 install Flask RPi.GPIO
+sudo -u "$ACTUAL_USER" pip3 install --break-system-packages -r "$INSTALL_DIR/requirements.txt" 2>/dev/null || \
+sudo -u "$ACTUAL_USER" pip3 install -r "$INSTALL_DIR/requirements.txt"
 echo ""
 
 # Create systemd service
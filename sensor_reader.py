@@ -1,50 +1,108 @@
-import glob
 import os
 import json
 import csv
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Each DS18B20 conversion blocks ~750ms in the kernel driver, so reading
+# sensors one after another costs n * 750ms. A small shared pool overlaps
+# the waits; created lazily so importing this module stays cheap.
+_read_pool = None
+
+def _get_read_pool():
+    global _read_pool
+    if _read_pool is None:
+        _read_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='w1read')
+    return _read_pool
+
+# 1-wire sysfs tree; whether we run against real hardware or mock data is
+# static for the process lifetime, so decide it once at import instead of
+# stat()ing the directory on every read
+W1_BASE_DIR = '/sys/bus/w1/devices/'
+_HAS_W1 = os.path.isdir(W1_BASE_DIR)
+
+# Newer w1_therm drivers expose a bulk-convert trigger on the bus master:
+# writing '1' starts the ~750ms conversion on every sensor at once, and
+# the following w1_slave reads return the cached result instead of each
+# re-triggering its own conversion
+_BULK_TRIGGER = W1_BASE_DIR + 'w1_bus_master1/therm_bulk_read'
+_HAS_BULK_READ = _HAS_W1 and os.path.exists(_BULK_TRIGGER)
+
+def _trigger_bulk_conversion():
+    """Kick off one shared conversion window for all sensors on the bus."""
+    if not _HAS_BULK_READ:
+        return
+    try:
+        with open(_BULK_TRIGGER, 'w') as f:
+            f.write('1')
+    except OSError:
+        # Driver said no (e.g. a non-bulk-capable slave on the bus);
+        # the per-sensor reads below still work, just slower
+        pass
 
 # Calibration offsets for each sensor (sensor_id: offset)
 OFFSET_FILE = 'sensor_offsets.json'
 
-# Memory caches to avoid disk I/O on every sensor read
+# Memory caches to avoid disk I/O on every sensor read. The cache is keyed
+# on the file's mtime: the steady-state cost per batch is one stat() instead
+# of an open+parse, while edits made outside this process (or a restore of
+# the file) still propagate without a restart.
 _offsets_cache = None
-_last_log_time = 0  # Track last temperature log time
-LOG_INTERVAL = 60  # Only log temperature data every 60 seconds
+_offsets_mtime = None
 
 def load_offsets():
-    global _offsets_cache
-    if _offsets_cache is None:
+    global _offsets_cache, _offsets_mtime
+    try:
+        mtime = os.stat(OFFSET_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _offsets_cache is None or mtime != _offsets_mtime:
         try:
             with open(OFFSET_FILE, 'r') as f:
                 _offsets_cache = json.load(f)
         except Exception:
             _offsets_cache = {}
+        _offsets_mtime = mtime
     return _offsets_cache
 
 def save_offsets(offsets):
-    global _offsets_cache
+    global _offsets_cache, _offsets_mtime
     with open(OFFSET_FILE, 'w') as f:
         json.dump(offsets, f)
     _offsets_cache = offsets  # Update cache
+    try:
+        _offsets_mtime = os.stat(OFFSET_FILE).st_mtime_ns
+    except OSError:
+        _offsets_mtime = None
+
+def read_single_sensor(sensor_id, base_dir=W1_BASE_DIR, offsets=None):
+    """Read a single sensor by ID for fast critical reads.
 
-def read_single_sensor(sensor_id, base_dir='/sys/bus/w1/devices/'):
-    """Read a single sensor by ID for fast critical reads"""
+    Batch callers pass the offsets dict in so it is resolved once per scan
+    instead of once per sensor.
+    """
     try:
-        folder = os.path.join(base_dir, sensor_id)
-        if not os.path.exists(folder):
-            return None
-            
-        with open(folder + '/w1_slave', 'r') as f:
-            lines = f.readlines()
-            if lines[0].strip()[-3:] == 'YES':
-                equals_pos = lines[1].find('t=')
-                if equals_pos != -1:
-                    temp_c = float(lines[1][equals_pos+2:]) / 1000.0
-                    # Apply offset if available (cached in memory)
-                    offsets = load_offsets()
-                    temp_c += offsets.get(sensor_id, 0.0)
-                    return temp_c
+        if offsets is None:
+            offsets = load_offsets()
+        # No exists() pre-check: open() raising ENOENT is one syscall
+        # instead of stat + open. The file is ~75 bytes; read it raw and
+        # scan bytes instead of paying readlines/decode/float
+        with open(os.path.join(base_dir, sensor_id, 'w1_slave'), 'rb') as f:
+            data = f.read()
+        newline = data.find(b'\n')
+        if newline != -1 and data[:newline].rstrip().endswith(b'YES'):
+            t_pos = data.rfind(b't=')
+            if t_pos != -1:
+                # Raw reading is milli-degrees as a decimal integer
+                temp_c = int(data[t_pos + 2:]) / 1000.0
+                # Apply offset if available (cached in memory)
+                temp_c += offsets.get(sensor_id, 0.0)
+                return temp_c
+    except FileNotFoundError:
+        # Sensor not present - same quiet None the old exists() check gave
+        pass
     except Exception as e:
         print(f"Error reading sensor {sensor_id}: {e}")
     return None
@@ -52,10 +110,8 @@ def read_single_sensor(sensor_id, base_dir='/sys/bus/w1/devices/'):
 def read_sensors_by_id(sensor_ids):
     """Read specific sensors by ID - fast, direct lookup"""
     try:
-        base_dir = '/sys/bus/w1/devices/'
-        
         # Check if we're on a Raspberry Pi with actual sensors
-        if not os.path.exists(base_dir):
+        if not _HAS_W1:
             # Return mock data for development/testing
             import random
             result = []
@@ -72,29 +128,35 @@ def read_sensors_by_id(sensor_ids):
                     })
             return result
         
+        # Overlap the per-sensor conversion waits; map() preserves the
+        # order of sensor_ids. Offsets are resolved once for the batch.
+        offsets = load_offsets()
+        read = partial(read_single_sensor, offsets=offsets)
+        if len(sensor_ids) > 1:
+            _trigger_bulk_conversion()
+            temps = _get_read_pool().map(read, sensor_ids)
+        else:
+            temps = (read(sid) for sid in sensor_ids)
+
         sensors = []
-        for sensor_id in sensor_ids:
-            temp = read_single_sensor(sensor_id, base_dir)
+        for sensor_id, temp in zip(sensor_ids, temps):
             if temp is not None:
                 sensors.append({
                     'id': sensor_id,
                     'temperature': temp
                 })
-        
+
         return sensors
     except Exception as e:
         print(f"Error in read_sensors_by_id: {e}")
-        import traceback
         traceback.print_exc()
         return []
 
 def read_sensors():
     """Read all sensors - returns list with sensor IDs and temperatures"""
     try:
-        base_dir = '/sys/bus/w1/devices/'
-        
         # Check if we're on a Raspberry Pi with actual sensors
-        if not os.path.exists(base_dir):
+        if not _HAS_W1:
             # Return mock data for development/testing
             import random
             sensors = [
@@ -103,42 +165,31 @@ def read_sensors():
             ]
             return sensors
         
-        device_folders = glob.glob(base_dir + '28-*')
+        # scandir yields entry names directly (no basename, no fnmatch, no
+        # per-entry lstat that glob pays to verify its pattern)
+        sensor_ids = [e.name for e in os.scandir(W1_BASE_DIR)
+                      if e.name.startswith('28-')]
+
+        # Fan the per-sensor conversions out over the shared pool (each one
+        # blocks ~750ms in the kernel driver); read_single_sensor handles
+        # the parse and per-sensor error reporting, with the offsets dict
+        # resolved once for the whole scan
         offsets = load_offsets()
-        sensors = []
-        
-        for folder in device_folders:
-            sensor_id = os.path.basename(folder)
-            try:
-                with open(folder + '/w1_slave', 'r') as f:
-                    lines = f.readlines()
-                    if lines[0].strip()[-3:] == 'YES':
-                        equals_pos = lines[1].find('t=')
-                        if equals_pos != -1:
-                            temp_c = float(lines[1][equals_pos+2:]) / 1000.0
-                            # Apply offset if available
-                            temp_c += offsets.get(sensor_id, 0.0)
-                            sensors.append({
-                                'id': sensor_id,
-                                'temperature': temp_c
-                            })
-            except Exception as e:
-                print(f"Error reading sensor {sensor_id}: {e}")
-        
-        # Log readings for histogram - only every LOG_INTERVAL seconds
-        global _last_log_time
-        current_time = time.time()
-        if current_time - _last_log_time >= LOG_INTERVAL:
-            try:
-                log_temperature_data(sensors)
-                _last_log_time = current_time
-            except Exception as e:
-                print(f"Error logging temperature data: {e}")
-        
-        return sensors
+        read = partial(read_single_sensor, offsets=offsets)
+        if len(sensor_ids) > 1:
+            _trigger_bulk_conversion()
+            temps = _get_read_pool().map(read, sensor_ids)
+        else:
+            temps = (read(sid) for sid in sensor_ids)
+
+        # Logging is the caller's concern: the app's polling loop feeds the
+        # batched log writer with named 4-column rows, and duplicating them
+        # here as unbuffered 3-column rows doubled the SD-card writes
+        return [{'id': sensor_id, 'temperature': temp}
+                for sensor_id, temp in zip(sensor_ids, temps)
+                if temp is not None]
     except Exception as e:
         print(f"Critical error in read_sensors: {e}")
-        import traceback
         traceback.print_exc()
         # Return empty list on critical error
         return []
@@ -2,12 +2,13 @@
 """Test script to check API response times"""
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-def test_api_endpoint(url, name):
+def test_api_endpoint(session, url, name):
     """Test an API endpoint and measure response time"""
     try:
         start = time.time()
-        response = requests.get(url, timeout=5)
+        response = session.get(url, timeout=5)
         elapsed = time.time() - start
         print(f"{name}: {response.status_code} in {elapsed:.2f}s")
         if response.status_code == 200:
@@ -26,20 +27,23 @@ def test_api_endpoint(url, name):
 
 if __name__ == "__main__":
     base_url = "http://localhost:5000"
-    
+
     print("Testing API endpoints...")
     print("-" * 50)
-    
+
     endpoints = [
         ("/api/temps_named", "Temps Named"),
         ("/api/status", "Status"),
         ("/api/sensors", "Sensors"),
     ]
-    
-    for endpoint, name in endpoints:
-        test_api_endpoint(f"{base_url}{endpoint}", name)
-        print()
-        time.sleep(0.5)
-    
+
+    # One Session for connection reuse; fire all probes at once so the
+    # timings reflect how the server behaves under concurrent requests
+    session = requests.Session()
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as ex:
+        futures = [ex.submit(test_api_endpoint, session, f"{base_url}{endpoint}", name)
+                   for endpoint, name in endpoints]
+        results = [f.result() for f in futures]
+
     print("-" * 50)
     print("Test complete")